@@ -2,24 +2,18 @@
 """Simple test runner to capture output"""
 import sys
 from pathlib import Path
-sys.path.insert(0, str(Path(__file__).parent / "lib"))
+sys.path.insert(0, str(Path(__file__).parent / "src"))
 
 # Run tests
 if __name__ == "__main__":
-    from tests.test_strategy_rsi import *
+    from tests import test_strategy_rsi, test_utils_s3
     
     import unittest
     loader = unittest.TestLoader()
-    suite = unittest.TestSuite()
     
     # Add all test classes
-    suite.addTests(loader.loadTestsFromTestCase(TestRSIWilder))
-    suite.addTests(loader.loadTestsFromTestCase(TestMACD))
-    suite.addTests(loader.loadTestsFromTestCase(TestTrendOk))
-    suite.addTests(loader.loadTestsFromTestCase(TestGenerateRSISignals))
-    suite.addTests(loader.loadTestsFromTestCase(TestCalculateSignalConfidence))
-    suite.addTests(loader.loadTestsFromTestCase(TestApplyGuardrails))
-    suite.addTests(loader.loadTestsFromTestCase(TestIntegration))
+    suite = loader.loadTestsFromModule(test_strategy_rsi)
+    suite.addTests(loader.loadTestsFromModule(test_utils_s3))
     
     runner = unittest.TextTestRunner(verbosity=2)
     result = runner.run(suite)
@@ -7,9 +7,12 @@ from .strategy_rsi import (
     rsi_wilder,
     macd,
     sma,
+    ema_last,
     generate_rsi_signals,
+    generate_rsi_signals_batch,
     apply_guardrails,
-    calculate_signal_confidence
+    calculate_signal_confidence,
+    calculate_signal_confidence_batch
 )
 
 from .utils_s3 import (
@@ -17,8 +20,11 @@ from .utils_s3 import (
     get_bucket,
     append_runlog_s3,
     save_dataframe_to_s3,
+    save_dataframe_to_s3_parquet,
+    save_signals_df_to_s3,
     save_text_to_s3,
     upload_df_to_s3_with_validation,
+    upload_df_to_s3_in_background,
     assert_allowed_bucket
 )
 
@@ -27,15 +33,21 @@ __all__ = [
     "rsi_wilder",
     "macd",
     "sma",
+    "ema_last",
     "generate_rsi_signals",
+    "generate_rsi_signals_batch",
     "apply_guardrails",
     "calculate_signal_confidence",
+    "calculate_signal_confidence_batch",
     # utils_s3 exports
     "create_s3_clients",
     "get_bucket",
     "append_runlog_s3",
     "save_dataframe_to_s3",
+    "save_dataframe_to_s3_parquet",
+    "save_signals_df_to_s3",
     "save_text_to_s3",
     "upload_df_to_s3_with_validation",
+    "upload_df_to_s3_in_background",
     "assert_allowed_bucket"
 ]
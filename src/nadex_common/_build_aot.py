@@ -0,0 +1,37 @@
+# _build_aot.py
+"""Ahead-of-time build of the indicator kernels.
+
+Run ``python -m nadex_common._build_aot`` (numba is needed at build time only)
+to write the ``_nadex_kernels`` extension next to this file. ``_njit_kernels``
+prefers that module when it is importable, so short-lived runs skip the JIT
+warm-up and the kernels work even where numba is not installed.
+"""
+from __future__ import annotations
+import os
+
+from numba.pycc import CC
+
+from . import _njit_kernels as k
+
+cc = CC("_nadex_kernels")
+cc.output_dir = os.path.dirname(os.path.abspath(__file__))
+cc.verbose = True
+
+cc.export("rsi_wilder_k", "f8[:](f8[:], i8)")(k._rsi_wilder_kernel.py_func)
+cc.export("macd_k", "UniTuple(f8[:], 3)(f8[:], f8, f8, f8)")(k._macd_kernel.py_func)
+cc.export("conf_k", "f8(f8, i8, i8, i8, f8, f8, f8)")(k._conf_scalar.py_func)
+cc.export(
+    "signals_k",
+    "Tuple((f8[:], i1[:], i1[:]))(f8[:], i8, f8, f8, f8, i8, f8[:], i8, f8, f8, f8, b1)",
+)(k._signals_kernel.py_func)
+
+
+def _kernels_version():
+    return k.KERNELS_VERSION
+
+
+# Lets _njit_kernels reject an extension built from older kernels
+cc.export("kernels_version", "i8()")(_kernels_version)
+
+if __name__ == "__main__":
+    cc.compile()
@@ -0,0 +1,25 @@
+# _njit.py
+"""Optional numba support for the indicator kernels.
+
+numba is an optional dependency. When it is not installed, ``njit`` becomes a
+no-op decorator so the kernels still import (and run as plain Python), and
+``NUMBA_AVAILABLE`` lets callers prefer the vectorized pandas path instead.
+"""
+from __future__ import annotations
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:  # pragma: no cover - exercised only without numba
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        """No-op stand-in for ``numba.njit`` (supports bare and called forms)."""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+
+        def decorator(func):
+            return func
+
+        return decorator
@@ -0,0 +1,258 @@
+# _njit_kernels.py
+"""Single-pass indicator kernels used by ``strategy_rsi``.
+
+Each kernel walks the input array once and reproduces the pandas
+implementation it replaces (same seeding, same edge-case values), so callers
+can switch between the two paths without changing results.
+"""
+from __future__ import annotations
+import warnings
+
+import numpy as np
+
+from ._njit import NUMBA_AVAILABLE, njit, prange
+
+# True when the kernels below are compiled (by numba, or ahead of time; see the
+# end of this module); otherwise they are plain Python loops and callers should
+# stay on the vectorized pandas path.
+KERNELS_AVAILABLE = NUMBA_AVAILABLE
+
+# Added to the average loss so RSI needs no zero-loss branch: with no losses
+# rs overflows towards inf and RSI reads 100.0, with no gains rs is 0 and RSI
+# reads 0.0. It is below half an ulp of any realistic average, so other values
+# are bit-identical.
+_RSI_EPS = 1e-300
+
+# Confidence scoring constants, shared with calculate_signal_confidence_batch.
+# Module-level globals are frozen into the compiled kernels as literals.
+CONF_CENTERLINE_RANGE = 25.0  # RSI points past the centerline for full confidence
+CONF_REVERSAL_RANGE = 30.0    # RSI points from the level where confidence hits 0
+CONF_TREND_BONUS = 1.2        # signal agrees with the trend
+CONF_TREND_PENALTY = 0.5      # signal fights the trend
+
+
+@njit(cache=True)
+def _rsi_wilder_kernel(close: np.ndarray, period: int) -> np.ndarray:
+    """
+    Wilder RSI over a float64 close array.
+
+    Matches ``ewm(alpha=1/period, adjust=False, min_periods=period)`` on the
+    gains/losses: the averages are seeded from the first delta and the first
+    ``period`` bars are warm-up. Warm-up bars and bars without gains read 0.0;
+    bars with gains but no losses read 100.0. Expects no NaN closes (pandas
+    skips those bars and reweights; callers keep such input on pandas).
+    """
+    n = close.shape[0]
+    out = np.zeros(n)
+    alpha = 1.0 / period
+    avg_gain = 0.0
+    avg_loss = 0.0
+    for i in range(1, n):
+        d = close[i] - close[i - 1]
+        g = d if d > 0.0 else 0.0
+        l = -d if d < 0.0 else 0.0
+        if i == 1:
+            avg_gain = g
+            avg_loss = l
+        else:
+            avg_gain += alpha * (g - avg_gain)
+            avg_loss += alpha * (l - avg_loss)
+        if i >= period:
+            out[i] = 100.0 - 100.0 / (1.0 + avg_gain / (avg_loss + _RSI_EPS))
+    return out
+
+
+@njit(cache=True)
+def _macd_kernel(close: np.ndarray, a_fast: float, a_slow: float, a_sig: float):
+    """
+    MACD line/signal/histogram over a float64 close array in one pass.
+
+    ``a_*`` are the EMA smoothing factors ``2 / (span + 1)``. All three EMAs
+    are seeded from the first bar, matching ``ewm(span=..., adjust=False)``.
+    Expects no NaN closes, as for ``_rsi_wilder_kernel``.
+    """
+    n = close.shape[0]
+    line = np.empty(n)
+    sig = np.empty(n)
+    hist = np.empty(n)
+    if n == 0:
+        return line, sig, hist
+    ef = close[0]
+    es = close[0]
+    sg = 0.0
+    for i in range(n):
+        x = close[i]
+        ef += a_fast * (x - ef)
+        es += a_slow * (x - es)
+        line_i = ef - es
+        sg += a_sig * (line_i - sg)
+        line[i] = line_i
+        sig[i] = sg
+        hist[i] = line_i - sg
+    return line, sig, hist
+
+
+@njit(cache=True)
+def _conf_scalar(rsi: float, trend_side: int, signal: int, mode_code: int,
+                 cl: float, os: float, ob: float) -> float:
+    """
+    Confidence score for one signal (see ``calculate_signal_confidence``).
+
+    ``mode_code`` is 0 for centerline and 1 for reversal; any other value
+    scores 0.0.
+    """
+    if signal == 0:
+        return 0.0
+
+    confidence = 0.0
+    if mode_code == 0:
+        if signal == 1:
+            confidence = min((rsi - cl) / CONF_CENTERLINE_RANGE, 1.0)
+        elif signal == -1:
+            confidence = min((cl - rsi) / CONF_CENTERLINE_RANGE, 1.0)
+    elif mode_code == 1:
+        if signal == 1:
+            confidence = max(1.0 - abs(rsi - os) / CONF_REVERSAL_RANGE, 0.0)
+        elif signal == -1:
+            confidence = max(1.0 - abs(rsi - ob) / CONF_REVERSAL_RANGE, 0.0)
+
+    if signal * trend_side > 0:
+        confidence = min(confidence * CONF_TREND_BONUS, 1.0)
+    elif signal * trend_side < 0:
+        confidence = confidence * CONF_TREND_PENALTY
+
+    return max(min(confidence, 1.0), 0.0)
+
+
+@njit(cache=True)
+def _signals_kernel(close: np.ndarray, period: int,
+                    a_fast: float, a_slow: float, a_sig: float,
+                    trend_code: int, ma: np.ndarray,
+                    mode_code: int, cl: float, os: float, ob: float,
+                    require_cross: bool):
+    """
+    RSI, trend side and signal for ``generate_rsi_signals`` in one pass.
+
+    Runs the ``_rsi_wilder_kernel`` and ``_macd_kernel`` recurrences side by
+    side. ``trend_code`` is 0 (none), 1 (MACD) or 2 (SMA, read from ``ma``
+    so the rolling mean matches pandas exactly); ``mode_code`` is 0 for
+    centerline and 1 for reversal. Expects no NaN closes, as for the
+    single-indicator kernels.
+    """
+    n = close.shape[0]
+    rsi = np.zeros(n)
+    tside = np.zeros(n, dtype=np.int8)
+    signal = np.zeros(n, dtype=np.int8)
+    if n == 0:
+        return rsi, tside, signal
+    alpha = 1.0 / period
+    avg_gain = 0.0
+    avg_loss = 0.0
+    ef = close[0]
+    es = close[0]
+    sg = 0.0
+    for i in range(n):
+        x = close[i]
+        if i > 0:
+            d = x - close[i - 1]
+            g = d if d > 0.0 else 0.0
+            l = -d if d < 0.0 else 0.0
+            if i == 1:
+                avg_gain = g
+                avg_loss = l
+            else:
+                avg_gain += alpha * (g - avg_gain)
+                avg_loss += alpha * (l - avg_loss)
+            if i >= period:
+                rsi[i] = 100.0 - 100.0 / (1.0 + avg_gain / (avg_loss + _RSI_EPS))
+
+        t = 0
+        if trend_code == 1:
+            ef += a_fast * (x - ef)
+            es += a_slow * (x - es)
+            line = ef - es
+            sg += a_sig * (line - sg)
+            t = 1 if line >= sg else -1
+        elif trend_code == 2:
+            t = 1 if x >= ma[i] else -1
+        tside[i] = t
+
+        r = rsi[i]
+        if mode_code == 0:
+            if r > cl and t >= 0:
+                signal[i] = 1
+            elif r < cl and t <= 0:
+                signal[i] = -1
+        elif require_cross:
+            if i > 0:
+                prev = rsi[i - 1]
+                if prev <= os and r > os:
+                    signal[i] = 1
+                elif prev >= ob and r < ob:
+                    signal[i] = -1
+        elif r <= os:
+            signal[i] = 1
+        elif r >= ob:
+            signal[i] = -1
+    return rsi, tside, signal
+
+
+@njit(parallel=True, cache=True)
+def _signals_batch_kernel(close: np.ndarray, period: int,
+                          a_fast: float, a_slow: float, a_sig: float,
+                          trend_code: int, ma: np.ndarray,
+                          mode_code: int, cl: float, os: float, ob: float,
+                          require_cross: bool):
+    """
+    ``_signals_kernel`` over each row of a C-contiguous (n_series, n_bars)
+    close array, rows spread across threads. ``ma`` has one row per series
+    (zero columns unless ``trend_code`` is 2).
+    """
+    n_rows = close.shape[0]
+    n = close.shape[1]
+    rsi = np.zeros((n_rows, n))
+    tside = np.zeros((n_rows, n), dtype=np.int8)
+    signal = np.zeros((n_rows, n), dtype=np.int8)
+    for t in prange(n_rows):
+        r, ts, sg = _signals_kernel(close[t], period, a_fast, a_slow, a_sig,
+                                    trend_code, ma[t], mode_code, cl, os, ob,
+                                    require_cross)
+        rsi[t] = r
+        tside[t] = ts
+        signal[t] = sg
+    return rsi, tside, signal
+
+
+# The fused signals kernels are only worth calling when numba compiled them
+signals_kernel = _signals_kernel if NUMBA_AVAILABLE else None
+signals_batch_kernel = _signals_batch_kernel if NUMBA_AVAILABLE else None
+
+# Bump whenever a kernel's code or signature changes. The AOT build records it,
+# and an extension built from other kernels is ignored instead of silently
+# running stale code.
+KERNELS_VERSION = 1
+
+# Prefer the ahead-of-time build (``python -m nadex_common._build_aot``) when
+# present: no JIT warm-up on first call, and it works without numba installed.
+try:
+    from . import _nadex_kernels as _aot
+except ImportError:
+    _aot = None
+
+if _aot is not None and getattr(_aot, "kernels_version", lambda: None)() != KERNELS_VERSION:
+    warnings.warn(
+        "Ignoring stale _nadex_kernels extension built from older kernels; "
+        "rebuild it with `python -m nadex_common._build_aot`"
+    )
+    _aot = None
+
+if _aot is not None:
+    conf_kernel = _aot.conf_k
+    macd_kernel = _aot.macd_k
+    rsi_wilder_kernel = _aot.rsi_wilder_k
+    signals_kernel = _aot.signals_k
+    KERNELS_AVAILABLE = True
+else:
+    conf_kernel = _conf_scalar
+    macd_kernel = _macd_kernel
+    rsi_wilder_kernel = _rsi_wilder_kernel
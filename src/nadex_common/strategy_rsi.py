@@ -3,74 +3,175 @@ from __future__ import annotations
 import numpy as np
 import pandas as pd
 
-def rsi_wilder(close: pd.Series, period: int = 14) -> pd.Series:
-    close = pd.Series(close).astype(float)
+from ._njit_kernels import (
+    CONF_CENTERLINE_RANGE, CONF_REVERSAL_RANGE, CONF_TREND_BONUS, CONF_TREND_PENALTY,
+    KERNELS_AVAILABLE, conf_kernel, macd_kernel, rsi_wilder_kernel,
+    signals_batch_kernel, signals_kernel
+)
+
+# Integer codes keep the kernels monomorphic (no strings in nopython mode)
+_RSI_MODE_CODES = {"centerline": 0, "reversal": 1}
+_TREND_CODES = {"none": 0, "macd": 1, "sma": 2}
+
+# pandas >= 3 always copies on write, so frames can share a caller's Series
+_PANDAS_COW = int(pd.__version__.split(".")[0]) >= 3
+
+def _as_float_series(close) -> pd.Series:
+    # Wrap once and skip the astype copy when the data is already float64
+    s = close if isinstance(close, pd.Series) else pd.Series(close)
+    return s if s.dtype == np.float64 else s.astype(np.float64)
+
+def _out_series(arr: np.ndarray, index, dtype) -> pd.Series:
+    # Recurrences run in float64; only the stored result is narrowed
+    return pd.Series(arr.astype(dtype, copy=False), index=index)
+
+def _rsi_wilder_arr(close: np.ndarray, period: int) -> np.ndarray:
+    if KERNELS_AVAILABLE and not np.isnan(close).any():
+        # Single fused pass over the closes (see _njit_kernels). Missing bars
+        # shift the pandas ewm weights, so those inputs stay on pandas.
+        return rsi_wilder_kernel(close, int(period))
+
+    close = pd.Series(close)
     delta = close.diff()
     gain = delta.clip(lower=0.0)
     loss = -delta.clip(upper=0.0)
     avg_gain = gain.ewm(alpha=1/period, adjust=False, min_periods=period).mean()
     avg_loss = loss.ewm(alpha=1/period, adjust=False, min_periods=period).mean()
     
+    ag = avg_gain.to_numpy()
+    al = avg_loss.to_numpy()
+    
     # Handle edge cases:
     # - If avg_loss is 0 (no losses), RSI should be 100 (maximum overbought)
     # - If avg_gain is 0 (no gains), RSI should be 0 (maximum oversold)
-    rs = avg_gain / avg_loss.replace(0.0, 1e-10)  # Use tiny value instead of NaN
-    rsi = 100.0 - (100.0 / (1.0 + rs))
-    
-    # Set RSI to 100 when there are gains but no losses
-    rsi = rsi.where(avg_loss > 0, 100.0)
-    # Set RSI to 0 when there are losses but no gains  
-    rsi = rsi.where(avg_gain > 0, 0.0)
-    
-    return rsi
+    # Warm-up bars (NaN averages) fail both comparisons and also read 0.
+    rs = ag / np.where(al > 0, al, 1.0)
+    return np.where(ag > 0, np.where(al > 0, 100.0 - 100.0 / (1.0 + rs), 100.0), 0.0)
 
-def macd(close: pd.Series, fast: int = 12, slow: int = 26, signal: int = 9):
-    close = pd.Series(close).astype(float)
+def rsi_wilder(close: pd.Series, period: int = 14, dtype=np.float64) -> pd.Series:
+    close = _as_float_series(close)
+    return _out_series(_rsi_wilder_arr(close.to_numpy(), period), close.index, dtype)
+
+def _macd_arr(close: np.ndarray, fast: int, slow: int, signal: int):
+    if KERNELS_AVAILABLE and not np.isnan(close).any():
+        # NaN closes stay on pandas, which skips them (see _rsi_wilder_arr)
+        return macd_kernel(close, 2.0 / (fast + 1), 2.0 / (slow + 1), 2.0 / (signal + 1))
+    close = pd.Series(close)
     ema_fast = close.ewm(span=fast, adjust=False).mean()
     ema_slow = close.ewm(span=slow, adjust=False).mean()
     line = ema_fast - ema_slow
     sig = line.ewm(span=signal, adjust=False).mean()
     hist = line - sig
-    return line, sig, hist
+    return line.to_numpy(), sig.to_numpy(), hist.to_numpy()
+
+def macd(close: pd.Series, fast: int = 12, slow: int = 26, signal: int = 9, dtype=np.float64):
+    close = _as_float_series(close)
+    idx = close.index
+    line, sig, hist = _macd_arr(close.to_numpy(), fast, slow, signal)
+    return _out_series(line, idx, dtype), _out_series(sig, idx, dtype), _out_series(hist, idx, dtype)
 
-def sma(close: pd.Series, window: int = 50) -> pd.Series:
-    return pd.Series(close).astype(float).rolling(window).mean()
+def sma(close: pd.Series, window: int = 50, dtype=np.float64) -> pd.Series:
+    """
+    Simple moving average over ``window`` bars (NaN during warm-up).
+    
+    Uses pandas' rolling mean on purpose: it returns the exact price for a
+    flat window, so the ``close >= ma`` trend test does not flip on rounding
+    when prices stall. Windowed numpy means and bottleneck's running sum
+    both lose that.
+    """
+    ma = _as_float_series(close).rolling(window).mean()
+    return ma if ma.dtype == dtype else ma.astype(dtype)
+
+def ema_last(close: pd.Series, span: int) -> float:
+    """
+    Last value of ``close.ewm(span=span, adjust=False).mean()``.
+    
+    The adjust=False EMA is a fixed weighted sum of the inputs, so when only
+    the latest value is needed it is one dot product instead of a full
+    recurrence.
+    
+    Parameters
+    ----------
+    close : pd.Series
+        Price series
+    span : int
+        EMA span
+        
+    Returns
+    -------
+    float
+        Latest EMA value (NaN for an empty series)
+    """
+    arr = _as_float_series(close).to_numpy()
+    if arr.size == 0:
+        return float("nan")
+    if np.isnan(arr).any():
+        # Missing bars shift the pandas weights; keep its exact semantics
+        return float(pd.Series(arr).ewm(span=span, adjust=False).mean().iloc[-1])
+    alpha = 2.0 / (span + 1)
+    # s_t = (1-a)^t x_0 + sum_j a (1-a)^(t-j) x_j
+    w = (1.0 - alpha) ** np.arange(arr.size - 1, -1, -1, dtype=np.float64)
+    w[1:] *= alpha
+    return float(w @ arr)
 
-def _cross_up(series: pd.Series, level: float) -> pd.Series:
-    s = pd.Series(series)
-    return (s.shift(1) <= level) & (s > level)
+def _cross_up(a: np.ndarray, level: float) -> np.ndarray:
+    out = np.zeros(a.shape, dtype=bool)
+    np.logical_and(a[:-1] <= level, a[1:] > level, out=out[1:])
+    return out
 
-def _cross_down(series: pd.Series, level: float) -> pd.Series:
-    s = pd.Series(series)
-    return (s.shift(1) >= level) & (s < level)
+def _cross_down(a: np.ndarray, level: float) -> np.ndarray:
+    out = np.zeros(a.shape, dtype=bool)
+    np.logical_and(a[:-1] >= level, a[1:] < level, out=out[1:])
+    return out
 
-def trend_ok(close: pd.Series, cfg: dict) -> pd.Series:
+def _trend_ok_arr(close: np.ndarray, cfg: dict) -> np.ndarray:
     trend_cfg = (cfg.get("trend") or {})
     t = str(trend_cfg.get("type", "none")).lower()
     if t == "macd":
-        line, sig, _ = macd(close,
-                            fast=trend_cfg.get("macd_fast", 12),
-                            slow=trend_cfg.get("macd_slow", 26),
-                            signal=trend_cfg.get("macd_signal", 9))
-        return pd.Series(np.where(line >= sig, 1, -1), index=pd.Series(close).index)
+        line, sig, _ = _macd_arr(close,
+                                 fast=trend_cfg.get("macd_fast", 12),
+                                 slow=trend_cfg.get("macd_slow", 26),
+                                 signal=trend_cfg.get("macd_signal", 9))
+        return np.where(line >= sig, 1, -1)
     if t == "sma":
-        ma = sma(close, trend_cfg.get("sma_window", 50))
-        return pd.Series(np.where(pd.Series(close) >= ma, 1, -1), index=pd.Series(close).index)
-    return pd.Series(0, index=pd.Series(close).index)
+        ma = sma(close, trend_cfg.get("sma_window", 50)).to_numpy()
+        return np.where(close >= ma, 1, -1)
+    return np.zeros(close.shape, dtype=int)
 
-def generate_rsi_signals(close: pd.Series, cfg: dict) -> pd.DataFrame:
+def trend_ok(close: pd.Series, cfg: dict) -> pd.Series:
+    close = _as_float_series(close)
+    return pd.Series(_trend_ok_arr(close.to_numpy(), cfg), index=close.index)
+
+def _signals_config(cfg: dict):
+    # (mode, period) plus the scalar arguments of the fused signal kernels
     r = cfg.get("rsi", {})
     mode = str(r.get("mode", "centerline")).lower()
     period = int(r.get("period", 14))
-    rsi = rsi_wilder(close, period)
-    tside = trend_ok(close, cfg)
-    sig = pd.Series(0, index=pd.Series(close).index)
+    if mode not in _RSI_MODE_CODES:
+        raise ValueError(f"Unknown RSI mode: {mode}")
+    trend_cfg = (cfg.get("trend") or {})
+    trend_code = _TREND_CODES.get(str(trend_cfg.get("type", "none")).lower(), 0)
+    fast = trend_cfg.get("macd_fast", 12)
+    slow = trend_cfg.get("macd_slow", 26)
+    signal = trend_cfg.get("macd_signal", 9)
+    head = (period, 2.0 / (fast + 1), 2.0 / (slow + 1), 2.0 / (signal + 1), trend_code)
+    tail = (_RSI_MODE_CODES[mode],
+            float(r.get("centerline", 50)),
+            float(r.get("oversold", 30)),
+            float(r.get("overbought", 70)),
+            bool(r.get("require_cross", True)))
+    return mode, period, head, tail
+
+def _signals_steps(close: np.ndarray, cfg: dict, mode: str, period: int):
+    # Indicator by indicator with numpy masks (no numba)
+    r = cfg.get("rsi", {})
+    rsi = _rsi_wilder_arr(close, period)
+    tside = _trend_ok_arr(close, cfg)
     if mode == "centerline":
         cl = float(r.get("centerline", 50))
         buy  = (rsi > cl) & (tside >= 0)  # >= 0 instead of == 1
         sell = (rsi < cl) & (tside <= 0)  # <= 0 instead of == -1
-        sig = np.select([buy, sell], [1, -1], default=0)  # ← ADD THIS LINE
-    elif mode == "reversal":
+    else:
         ob = float(r.get("overbought", 70))
         os = float(r.get("oversold", 30))
         if bool(r.get("require_cross", True)):
@@ -79,15 +180,87 @@ def generate_rsi_signals(close: pd.Series, cfg: dict) -> pd.DataFrame:
         else:
             buy  = (rsi <= os)
             sell = (rsi >= ob)
-        sig = np.select([buy, sell], [1, -1], default=0)
+    sig = np.where(buy, 1, np.where(sell, -1, 0))
+    # trend_side/signal are in {-1, 0, 1}
+    return rsi, tside.astype(np.int8), sig.astype(np.int8)
+
+def _signals_arr(close: np.ndarray, cfg: dict):
+    mode, period, head, tail = _signals_config(cfg)
+    if signals_kernel is None or np.isnan(close).any():
+        # NaN closes stay on pandas, which skips them (see _rsi_wilder_arr)
+        return _signals_steps(close, cfg, mode, period)
+    # Single pass through the fused kernel; same results as the step-by-step path
+    if head[-1] == 2:
+        ma = sma(close, (cfg.get("trend") or {}).get("sma_window", 50)).to_numpy()
     else:
-        raise ValueError(f"Unknown RSI mode: {mode}")
+        ma = np.empty(0)
+    return signals_kernel(close, *head, ma, *tail)
+
+def generate_rsi_signals(close: pd.Series, cfg: dict) -> pd.DataFrame:
+    idx = close.index if isinstance(close, pd.Series) else None
+    close_arr = np.ascontiguousarray(close, dtype=np.float64)
+    rsi, tside, sig = _signals_arr(close_arr, cfg)
+    
+    # Build the frame without copying: the indicator arrays are fresh, and
+    # a float64 input Series is shared under copy-on-write. Anything else
+    # that came through unconverted would alias the caller and is copied.
+    if isinstance(close, pd.Series) and close.dtype == np.float64:
+        close_col = close if _PANDAS_COW else close_arr.copy()
+    elif close_arr is close:
+        close_col = close_arr.copy()
+    else:
+        close_col = close_arr
+    # rsi fits float32
     return pd.DataFrame({
-        "close": pd.Series(close).astype(float),
-        "rsi": rsi.astype(float),
-        "trend_side": tside.astype(int),
-        "signal": pd.Series(sig, index=pd.Series(close).index, dtype=int)
-    })
+        "close": close_col,
+        "rsi": rsi.astype(np.float32),
+        "trend_side": tside,
+        "signal": sig
+    }, index=idx, copy=False)
+
+def generate_rsi_signals_batch(close_2d: np.ndarray, cfg: dict):
+    """
+    ``generate_rsi_signals`` for many equal-length price series at once.
+    
+    With numba the series are processed in parallel, one row per thread.
+    
+    Parameters
+    ----------
+    close_2d : array-like, shape (n_series, n_bars)
+        Closing prices, one series (e.g. ticker) per row
+    cfg : dict
+        Strategy configuration, as for ``generate_rsi_signals``
+        
+    Returns
+    -------
+    tuple of np.ndarray
+        ``(rsi, trend_side, signal)``, each shaped like ``close_2d``, with the
+        same dtypes and values as the matching ``generate_rsi_signals`` columns
+    """
+    close_2d = np.ascontiguousarray(close_2d, dtype=np.float64)
+    if close_2d.ndim != 2:
+        raise ValueError(f"close_2d must be 2-D (n_series, n_bars), got {close_2d.ndim}-D")
+    mode, period, head, tail = _signals_config(cfg)
+    
+    if signals_batch_kernel is None:
+        rsi = np.zeros(close_2d.shape)
+        tside = np.zeros(close_2d.shape, dtype=np.int8)
+        sig = np.zeros(close_2d.shape, dtype=np.int8)
+        for t, row in enumerate(close_2d):
+            rsi[t], tside[t], sig[t] = _signals_steps(row, cfg, mode, period)
+        return rsi.astype(np.float32), tside, sig
+    
+    if head[-1] == 2:
+        # Column-wise pandas rolling mean, exactly as sma() per series
+        window = (cfg.get("trend") or {}).get("sma_window", 50)
+        ma = np.ascontiguousarray(pd.DataFrame(close_2d.T).rolling(window).mean().to_numpy().T)
+    else:
+        ma = np.empty((close_2d.shape[0], 0))
+    rsi, tside, sig = signals_batch_kernel(close_2d, *head, ma, *tail)
+    # Rows with NaN closes are redone on pandas, as in _signals_arr
+    for t in np.flatnonzero(np.isnan(close_2d).any(axis=1)):
+        rsi[t], tside[t], sig[t] = _signals_steps(close_2d[t], cfg, mode, period)
+    return rsi.astype(np.float32), tside, sig
 
 def calculate_signal_confidence(rsi: float, trend_side: int, signal: int,
                                 rsi_mode: str = "centerline",
@@ -119,39 +292,65 @@ def calculate_signal_confidence(rsi: float, trend_side: int, signal: int,
     float
         Confidence score between 0.0 and 1.0
     """
-    if signal == 0:
-        return 0.0
+    return conf_kernel(float(rsi), int(trend_side), int(signal),
+                       _RSI_MODE_CODES.get(rsi_mode, -1),
+                       float(rsi_centerline), float(rsi_oversold), float(rsi_overbought))
+
+def calculate_signal_confidence_batch(rsi: np.ndarray, trend_side: np.ndarray,
+                                      signal: np.ndarray,
+                                      rsi_mode: str = "centerline",
+                                      rsi_centerline: float = 50,
+                                      rsi_oversold: float = 30,
+                                      rsi_overbought: float = 70) -> np.ndarray:
+    """
+    Vectorized ``calculate_signal_confidence`` over whole columns.
     
-    confidence = 0.0
+    Parameters
+    ----------
+    rsi : array-like of float
+        RSI values (0-100)
+    trend_side : array-like of int
+        Trend direction per row: 1 (up), -1 (down), 0 (neutral)
+    signal : array-like of int
+        Trading signal per row: 1 (buy), -1 (sell), 0 (no trade)
+    rsi_mode, rsi_centerline, rsi_oversold, rsi_overbought
+        Same as ``calculate_signal_confidence``
+        
+    Returns
+    -------
+    np.ndarray
+        Confidence scores between 0.0 and 1.0, one per row
+    """
+    rsi = np.asarray(rsi, dtype=np.float64)
+    trend_side = np.asarray(trend_side)
+    signal = np.asarray(signal)
+    buy_mask = signal == 1
+    sell_mask = signal == -1
     
+    conf = np.zeros(rsi.shape)
     if rsi_mode == "centerline":
-        # For centerline mode: confidence based on distance from centerline
-        # Adjusted divisor from 50 to 25 for more reasonable confidence scores
-        if signal == 1:  # Buy signal
-            # Higher confidence when RSI is well above centerline
-            confidence = min((rsi - rsi_centerline) / 25.0, 1.0)
-        elif signal == -1:  # Sell signal
-            # Higher confidence when RSI is well below centerline
-            confidence = min((rsi_centerline - rsi) / 25.0, 1.0)
-    
+        conf[buy_mask] = np.minimum((rsi[buy_mask] - rsi_centerline) / CONF_CENTERLINE_RANGE, 1.0)
+        conf[sell_mask] = np.minimum((rsi_centerline - rsi[sell_mask]) / CONF_CENTERLINE_RANGE, 1.0)
     elif rsi_mode == "reversal":
-        # For reversal mode: confidence based on distance from extreme
-        if signal == 1:  # Buy signal (from oversold)
-            # Higher confidence when close to oversold level
-            distance_from_oversold = abs(rsi - rsi_oversold)
-            confidence = max(1.0 - (distance_from_oversold / 30.0), 0.0)
-        elif signal == -1:  # Sell signal (from overbought)
-            # Higher confidence when close to overbought level
-            distance_from_overbought = abs(rsi - rsi_overbought)
-            confidence = max(1.0 - (distance_from_overbought / 30.0), 0.0)
-    
-    # Bonus confidence if signal aligns with trend
-    if signal * trend_side > 0:  # Signal and trend in same direction
-        confidence = min(confidence * 1.2, 1.0)
-    elif signal * trend_side < 0:  # Signal and trend opposed
-        confidence = confidence * 0.5
-    
-    return max(min(confidence, 1.0), 0.0)  # Ensure 0.0 <= confidence <= 1.0
+        conf[buy_mask] = np.maximum(1.0 - np.abs(rsi[buy_mask] - rsi_oversold) / CONF_REVERSAL_RANGE, 0.0)
+        conf[sell_mask] = np.maximum(1.0 - np.abs(rsi[sell_mask] - rsi_overbought) / CONF_REVERSAL_RANGE, 0.0)
+    
+    # Trend alignment: bonus when aligned, penalty when opposed
+    alignment = signal * trend_side
+    conf = np.where(alignment > 0, np.minimum(conf * CONF_TREND_BONUS, 1.0),
+                    np.where(alignment < 0, conf * CONF_TREND_PENALTY, conf))
+    return np.clip(conf, 0.0, 1.0)
+
+def _top_k(values: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the k largest values in O(n); ties keep the earliest, like nlargest(keep="first")."""
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    if values.size <= k:
+        return np.arange(values.size)
+    kth = -np.partition(-values, k - 1)[k - 1]
+    above = np.flatnonzero(values > kth)
+    ties = np.flatnonzero(values == kth)[:k - above.size]
+    return np.concatenate([above, ties])
 
 def apply_guardrails(df: pd.DataFrame, cfg: dict, 
                     signal_col: str = "signal",
@@ -174,41 +373,33 @@ def apply_guardrails(df: pd.DataFrame, cfg: dict,
     Returns
     -------
     pd.DataFrame
-        Filtered DataFrame respecting guardrails
+        Filtered DataFrame respecting guardrails. Kept rows (all no-trade rows
+        plus the surviving trades) stay in their original order and index.
     """
     guardrails = cfg.get("guardrails", {})
     
-    # Make a copy to avoid modifying original
-    result = df.copy()
-    
-    # Filter to only actual trade signals (non-zero)
-    if signal_col in result.columns:
-        trade_mask = result[signal_col] != 0
-        trade_signals = result[trade_mask].copy()
-        no_trade_signals = result[~trade_mask].copy()
-    else:
-        return result
-    
-    if trade_signals.empty:
-        return result
+    if signal_col not in df.columns:
+        return df.copy()
     
-    # Apply confidence threshold if confidence column exists
-    if confidence_col and confidence_col in trade_signals.columns:
-        confidence_threshold = float(guardrails.get("confidence_threshold", 0.6))
-        trade_signals = trade_signals[
-            trade_signals[confidence_col] >= confidence_threshold
-        ]
+    # Positions of actual trade signals (non-zero)
+    sig = df[signal_col].to_numpy()
+    trade_idx = np.flatnonzero(sig != 0)
+    if trade_idx.size == 0:
+        return df.copy()
     
-    # Limit positions per day
     max_positions = int(guardrails.get("max_positions_per_day", 3))
-    if confidence_col and confidence_col in trade_signals.columns:
-        # Sort by confidence and keep top N
-        trade_signals = trade_signals.nlargest(max_positions, confidence_col, keep="first")
+    if confidence_col and confidence_col in df.columns:
+        # Apply confidence threshold, then keep the top N by confidence
+        confidence_threshold = float(guardrails.get("confidence_threshold", 0.6))
+        conf = df[confidence_col].to_numpy(dtype=np.float64)[trade_idx]
+        passed = conf >= confidence_threshold
+        trade_idx, conf = trade_idx[passed], conf[passed]
+        trade_idx = trade_idx[_top_k(conf, max_positions)]
     else:
         # Just take first N
-        trade_signals = trade_signals.head(max_positions)
-    
-    # Combine back filtered trades with no-trade signals
-    result = pd.concat([trade_signals, no_trade_signals], ignore_index=True)
+        trade_idx = trade_idx[:max_positions]
     
-    return result
+    keep = sig == 0
+    keep[trade_idx] = True
+    # Positional take skips the boolean-indexer validation of .loc
+    return df.take(np.flatnonzero(keep))
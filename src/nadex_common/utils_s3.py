@@ -2,19 +2,48 @@
 """S3 utility functions for Nadex recommendation system."""
 from __future__ import annotations
 import io
-import csv
 import datetime as dt
-from typing import Iterable, Optional, Dict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Iterable, Iterator, Optional, Dict
 import pandas as pd
 import boto3
+from boto3.s3.transfer import TransferConfig
 from botocore.exceptions import ClientError
 from botocore import UNSIGNED
 from botocore.config import Config
+from s3transfer.futures import TransferFuture
+from s3transfer.manager import TransferManager
 
 # ============================================================================
 # S3 CLIENT CREATION
 # ============================================================================
 
+# Shared client settings: a larger connection pool for parallel transfers and
+# adaptive retries to back off cleanly on S3 throttling.
+CLIENT_CONFIG = Config(max_pool_connections=32, retries={"mode": "adaptive"})
+
+
+@lru_cache(maxsize=8)
+def _cached_s3_clients(profile: str, region: Optional[str]) -> Dict[str, boto3.client]:
+    session = boto3.Session(profile_name=profile, region_name=region)
+    return {
+        "public": session.client(
+            "s3",
+            config=CLIENT_CONFIG.merge(Config(signature_version=UNSIGNED)),
+            region_name=region,
+        ),
+        "private": session.client("s3", config=CLIENT_CONFIG),
+        "resource": session.resource("s3", config=CLIENT_CONFIG),
+    }
+
+
+@lru_cache(maxsize=8)
+def _default_s3_client(region: Optional[str]) -> boto3.client:
+    return boto3.client("s3", region_name=region, config=CLIENT_CONFIG)
+
+
 def create_s3_clients(
     profile: str = "default", 
     region: str = None
@@ -22,6 +51,13 @@ def create_s3_clients(
     """
     Create S3 clients for public and private access.
     
+    Sessions and clients are cached per ``(profile, region)`` for the life of
+    the process, so repeated calls skip credential resolution and botocore
+    model loading. The returned dict is a fresh copy; the clients are shared.
+    The cached ``resource`` is shared process-wide as well, but unlike the
+    clients it is not thread-safe: use the clients from worker threads, or
+    create a separate resource per thread.
+    
     Parameters
     ----------
     profile : str, default "default"
@@ -34,16 +70,7 @@ def create_s3_clients(
     dict
         Dictionary with keys: 'public', 'private', 'resource'
     """
-    session = boto3.Session(profile_name=profile, region_name=region)
-    return {
-        "public": session.client(
-            "s3",
-            config=Config(signature_version=UNSIGNED),
-            region_name=region,
-        ),
-        "private": session.client("s3"),
-        "resource": session.resource("s3"),
-    }
+    return dict(_cached_s3_clients(profile, region))
 
 
 def get_bucket(resource: boto3.resource, name: str):
@@ -68,6 +95,47 @@ def get_bucket(resource: boto3.resource, name: str):
 # DATAFRAME UPLOAD FUNCTIONS
 # ============================================================================
 
+# CSV uploads switch to parallel multipart above 8 MiB
+CSV_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=16,
+    use_threads=True,
+)
+
+
+def _csv_buffer(df: pd.DataFrame, **to_csv_kwargs) -> io.BytesIO:
+    """Write ``df`` as UTF-8 CSV straight into a bytes buffer, rewound for reading."""
+    buffer = io.BytesIO()
+    df.to_csv(buffer, encoding="utf-8", **to_csv_kwargs)
+    buffer.seek(0)
+    return buffer
+
+
+def _upload_csv(s3_client, df: pd.DataFrame, bucket: str, key: str, **to_csv_kwargs) -> None:
+    """Write ``df`` as UTF-8 CSV into a bytes buffer and upload it."""
+    s3_client.upload_fileobj(
+        _csv_buffer(df, **to_csv_kwargs), bucket, key,
+        ExtraArgs={"ContentType": "text/csv"},
+        Config=CSV_TRANSFER_CONFIG,
+    )
+
+
+# Upload error codes that mean the bucket itself is unusable
+BUCKET_ACCESS_ERRORS = ("NoSuchBucket", "AccessDenied", "PermanentRedirect", "AllAccessDisabled")
+
+
+def _upload_error(e: ClientError, bucket: str, key: str, region: Optional[str]) -> RuntimeError:
+    """Translate a failed CSV upload into the RuntimeError callers expect."""
+    code = e.response['Error']['Code']
+    msg = e.response['Error']['Message']
+    if code in BUCKET_ACCESS_ERRORS:
+        return RuntimeError(
+            f"Could not access bucket '{bucket}' (region={region}): {msg} (code {code})"
+        )
+    return RuntimeError(f"Failed to upload CSV to s3://{bucket}/{key}: {msg}")
+
+
 def upload_df_to_s3_with_validation(
     df: pd.DataFrame,
     bucket: str,
@@ -78,8 +146,10 @@ def upload_df_to_s3_with_validation(
     """
     Uploads a DataFrame to S3 as CSV with bucket validation.
     
-    This function verifies bucket existence before uploading and provides
-    detailed error messages if upload fails.
+    Bucket problems (missing bucket, no access, wrong region) are reported
+    from the upload's own error response, so no separate HeadBucket
+    round-trip is made, and detailed error messages are provided if the
+    upload fails.
     
     Parameters
     ----------
@@ -100,31 +170,76 @@ def upload_df_to_s3_with_validation(
         If bucket doesn't exist or upload fails
     """
     bucket = bucket.strip()
-    s3 = boto3.client('s3', region_name=region)
-
-    # Verify bucket exists
-    try:
-        s3.head_bucket(Bucket=bucket)
-    except ClientError as e:
-        code = e.response['Error']['Code']
-        msg = e.response['Error']['Message']
-        raise RuntimeError(
-            f"Could not access bucket '{bucket}' (region={region}): {msg} (code {code})"
-        ) from e
+    s3 = _default_s3_client(region)
 
     # Upload DataFrame as CSV
-    buffer = io.StringIO()
-    df.to_csv(buffer, index=index)
-    buffer.seek(0)
-
     try:
-        s3.put_object(Bucket=bucket, Key=key, Body=buffer.getvalue())
+        _upload_csv(s3, df, bucket, key, index=index)
         print(f"✅ Uploaded to s3://{bucket}/{key}")
     except ClientError as e:
-        raise RuntimeError(
-            f"Failed to upload CSV to s3://{bucket}/{key}: "
-            f"{e.response['Error']['Message']}"
-        ) from e
+        raise _upload_error(e, bucket, key, region) from e
+
+
+@contextmanager
+def upload_df_to_s3_in_background(
+    df: pd.DataFrame,
+    bucket: str,
+    key: str,
+    region: str = None,
+    index: bool = False
+) -> Iterator[TransferFuture]:
+    """
+    Uploads a DataFrame to S3 as CSV while the ``with`` body runs.
+    
+    The upload starts on entry and is waited for on exit, so other work in
+    the body (e.g. printing a report) overlaps the S3 round-trips. Errors
+    are reported as in ``upload_df_to_s3_with_validation`` when the block
+    exits; anything that must only happen after a successful upload (such
+    as logging the run) belongs after the block. If the body raises, the
+    upload is cancelled.
+    
+    Parameters
+    ----------
+    df : pd.DataFrame
+        DataFrame to upload
+    bucket : str
+        Name of the S3 bucket (leading/trailing spaces will be stripped)
+    key : str
+        S3 object key, e.g. "recommendations/20251120.csv"
+    region : str, optional
+        AWS region where the bucket resides
+    index : bool, default False
+        Whether to include DataFrame index in CSV
+        
+    Yields
+    ------
+    s3transfer.futures.TransferFuture
+        Future for the running upload
+        
+    Raises
+    ------
+    RuntimeError
+        If bucket doesn't exist or upload fails
+    
+    Examples
+    --------
+    >>> with upload_df_to_s3_in_background(df, bucket, key):
+    ...     show_interesting_trades(df)
+    >>> append_runlog_s3(s3, bucket, runlog_key, start_time=start)
+    """
+    bucket = bucket.strip()
+    # The manager cancels the upload if the body raises, and waits otherwise
+    with TransferManager(_default_s3_client(region), CSV_TRANSFER_CONFIG) as manager:
+        future = manager.upload(
+            _csv_buffer(df, index=index), bucket, key,
+            extra_args={"ContentType": "text/csv"},
+        )
+        yield future
+        try:
+            future.result()
+        except ClientError as e:
+            raise _upload_error(e, bucket, key, region) from e
+    print(f"✅ Uploaded to s3://{bucket}/{key}")
 
 
 def save_dataframe_to_s3(
@@ -154,8 +269,115 @@ def save_dataframe_to_s3(
     na_rep : str, default ""
         String representation of NaN values
     """
-    csv_bytes = df.to_csv(index=index, na_rep=na_rep).encode("utf-8")
-    s3_client.put_object(Bucket=bucket, Key=key, Body=csv_bytes, ContentType="text/csv")
+    _upload_csv(s3_client, df, bucket, key, index=index, na_rep=na_rep)
+
+
+def save_signals_df_to_s3(
+    s3_client, 
+    df: pd.DataFrame, 
+    bucket: str, 
+    key: str
+) -> None:
+    """
+    Save a numeric signals DataFrame to S3 as CSV using Arrow's CSV writer.
+    
+    Intended for the fixed-schema output of ``generate_rsi_signals``
+    (close, rsi, trend_side, signal), where Arrow formats rows in C instead of
+    pandas' per-cell Python loop. The index is not written. Falls back to
+    ``save_dataframe_to_s3`` when pyarrow is not installed.
+    
+    Both paths write the same unquoted header, rows and empty NaN fields and
+    read back to the same values, but the number text differs: Arrow writes
+    whole floats without the trailing ``.0`` that pandas adds (``100`` rather
+    than ``100.0``). Compare the files by value, not byte for byte.
+    
+    Parameters
+    ----------
+    s3_client : boto3.client
+        S3 client object
+    df : pd.DataFrame
+        Signals DataFrame to save
+    bucket : str
+        S3 bucket name
+    key : str
+        S3 object key
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pacsv
+    except ImportError:
+        save_dataframe_to_s3(s3_client, df, bucket, key)
+        return
+    
+    # Arrow quotes every header name by default, so write the header here
+    buffer = io.BytesIO()
+    buffer.write((",".join(map(str, df.columns)) + "\n").encode("utf-8"))
+    pacsv.write_csv(
+        pa.Table.from_pandas(df, preserve_index=False),
+        buffer,
+        pacsv.WriteOptions(include_header=False, quoting_style="none"),
+    )
+    s3_client.put_object(
+        Bucket=bucket, 
+        Key=key, 
+        Body=buffer.getvalue(), 
+        ContentType="text/csv"
+    )
+
+
+def save_dataframe_to_s3_parquet(
+    s3_client, 
+    df: pd.DataFrame, 
+    bucket: str, 
+    key: str, 
+    *, 
+    index: bool = False, 
+    compression: str = "zstd"
+) -> None:
+    """
+    Save DataFrame to S3 as Parquet (requires pyarrow).
+    
+    Parquet keeps column dtypes and is typically several times smaller and
+    faster to serialize than CSV for numeric frames such as the output of
+    ``generate_rsi_signals``. Use a ``.parquet`` key.
+    
+    Parameters
+    ----------
+    s3_client : boto3.client
+        S3 client object
+    df : pd.DataFrame
+        DataFrame to save
+    bucket : str
+        S3 bucket name
+    key : str
+        S3 object key, e.g. "signals/20251120.parquet"
+    index : bool, default False
+        Whether to store the index as a column
+    compression : str, default "zstd"
+        Parquet codec ("zstd", "snappy", "gzip", or "none")
+        
+    Raises
+    ------
+    ImportError
+        If pyarrow is not installed
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError(
+            "save_dataframe_to_s3_parquet requires pyarrow (pip install pyarrow)"
+        ) from e
+    
+    buffer = io.BytesIO()
+    table = pa.Table.from_pandas(df, preserve_index=index)
+    pq.write_table(table, buffer, compression=compression)
+    s3_client.put_object(
+        Bucket=bucket, 
+        Key=key, 
+        Body=buffer.getvalue(), 
+        ContentType="application/vnd.apache.parquet"
+    )
 
 
 # ============================================================================
@@ -203,6 +425,116 @@ RUNLOG_FIELDS = [
     "run_id", "notes"
 ]
 
+# Same line terminator as csv.DictWriter, which wrote the existing logs
+_RUNLOG_LINE_END = "\r\n"
+_RUNLOG_HEADER_BYTES = (",".join(RUNLOG_FIELDS) + _RUNLOG_LINE_END).encode("utf-8")
+
+# S3 requires every multipart part except the last to be at least 5 MiB, so
+# logs smaller than this are appended with a plain GET + PUT instead.
+MULTIPART_MIN_PART_SIZE = 5 * 1024 * 1024
+
+# Existing logs are read with one ranged GET of this size; anything beyond it
+# is fetched as parallel ranged GETs to overlap S3 request latency.
+RUNLOG_READ_CHUNK = 512 * 1024
+RUNLOG_READ_WORKERS = 8
+
+
+def _csv_field(value) -> str:
+    """Format one CSV field, quoting only when needed (csv.QUOTE_MINIMAL)."""
+    text = "" if value is None else str(value)
+    if any(c in text for c in ',"\r\n'):
+        return '"' + text.replace('"', '""') + '"'
+    return text
+
+
+def _runlog_line(row: dict) -> str:
+    """Format a run log row as one CSV line."""
+    return ",".join(_csv_field(row[f]) for f in RUNLOG_FIELDS) + _RUNLOG_LINE_END
+
+
+def _get_object_ranges(
+    s3_client,
+    bucket: str,
+    key: str,
+    start: int,
+    size: int,
+    etag: str
+) -> bytes:
+    """
+    Read bytes ``[start, size)`` of an object with parallel ranged GETs.
+    
+    ``etag`` pins every range to the same object version so a concurrent
+    writer cannot produce a torn read.
+    """
+    n_parts = min(RUNLOG_READ_WORKERS, -(-(size - start) // RUNLOG_READ_CHUNK))
+    bounds = [start + (size - start) * i // n_parts for i in range(n_parts + 1)]
+    
+    def fetch(lo_hi):
+        lo, hi = lo_hi
+        return s3_client.get_object(
+            Bucket=bucket, Key=key, Range=f"bytes={lo}-{hi - 1}", IfMatch=etag
+        )["Body"].read()
+    
+    with ThreadPoolExecutor(max_workers=n_parts) as pool:
+        return b"".join(pool.map(fetch, zip(bounds[:-1], bounds[1:])))
+
+
+def _append_runlog_multipart(
+    s3_client,
+    bucket: str,
+    key: str,
+    row: dict,
+    size: int,
+    etag: str
+) -> None:
+    """
+    Append a row to a large run log without downloading it.
+    
+    The existing object becomes part 1 of a multipart upload via a
+    server-side ``UploadPartCopy``; only the new row is sent as part 2.
+    ``etag`` pins both reads to the object version that was sized, so a
+    concurrent writer makes this call fail instead of losing a row.
+    """
+    last_byte = s3_client.get_object(
+        Bucket=bucket, Key=key, Range=f"bytes={size - 1}-{size - 1}", IfMatch=etag
+    )["Body"].read()
+    
+    line = _runlog_line(row).encode("utf-8")
+    if last_byte != b"\n":
+        line = b"\n" + line
+    
+    upload_id = s3_client.create_multipart_upload(
+        Bucket=bucket, Key=key, ContentType="text/csv"
+    )["UploadId"]
+    try:
+        copied = s3_client.upload_part_copy(
+            Bucket=bucket,
+            Key=key,
+            UploadId=upload_id,
+            PartNumber=1,
+            CopySource={"Bucket": bucket, "Key": key},
+            CopySourceIfMatch=etag
+        )
+        appended = s3_client.upload_part(
+            Bucket=bucket,
+            Key=key,
+            UploadId=upload_id,
+            PartNumber=2,
+            Body=line
+        )
+        s3_client.complete_multipart_upload(
+            Bucket=bucket,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={"Parts": [
+                {"ETag": copied["CopyPartResult"]["ETag"], "PartNumber": 1},
+                {"ETag": appended["ETag"], "PartNumber": 2},
+            ]}
+        )
+    except Exception:
+        s3_client.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+        raise
+
 
 def append_runlog_s3(
     s3_client, 
@@ -221,7 +553,9 @@ def append_runlog_s3(
     Append a row to the run log CSV in S3.
     
     This function fetches the existing log (if it exists), appends a new row,
-    and writes it back to S3.
+    and writes it back to S3. Logs over ``RUNLOG_READ_CHUNK`` are read with
+    parallel ranged GETs; logs of ``MULTIPART_MIN_PART_SIZE`` or more are not
+    downloaded at all and the row is appended with a server-side multipart copy.
     
     Parameters
     ----------
@@ -262,34 +596,51 @@ def append_runlog_s3(
     }
     
     # Fetch existing log (if present)
-    buf = io.StringIO()
+    existing = b""
     need_header = False
+    obj = None
     try:
-        obj = s3_client.get_object(Bucket=bucket, Key=key)
-        buf.write(obj["Body"].read().decode("utf-8"))
+        obj = s3_client.get_object(
+            Bucket=bucket, Key=key, Range=f"bytes=0-{RUNLOG_READ_CHUNK - 1}"
+        )
     except ClientError as e:
         code = e.response.get("Error", {}).get("Code", "")
         if code in ("NoSuchKey", "404", "NoSuchBucket"):
             need_header = True
-        else:
+        elif code != "InvalidRange":  # InvalidRange: the log exists but is empty
             raise
     
-    if buf.tell() == 0:
+    if obj is not None:
+        # Total size comes from Content-Range ("bytes 0-N/size") on a 206
+        content_range = obj.get("ContentRange")
+        size = int(content_range.rsplit("/", 1)[1]) if content_range else obj["ContentLength"]
+        if size >= MULTIPART_MIN_PART_SIZE:
+            # Large log: leave the existing bytes on S3 and send only the new row
+            obj["Body"].close()
+            _append_runlog_multipart(s3_client, bucket, key, row, size, obj["ETag"])
+            return
+        existing = obj["Body"].read()
+        if len(existing) < size:
+            existing += _get_object_ranges(
+                s3_client, bucket, key, len(existing), size, obj["ETag"]
+            )
+    
+    if not existing:
         need_header = True
     
     # Append new row
-    writer = csv.DictWriter(buf, fieldnames=RUNLOG_FIELDS)
+    prefix = b""
     if need_header:
-        writer.writeheader()
-    if buf.getvalue() and not buf.getvalue().endswith("\n"):
-        buf.write("\n")
-    writer.writerow(row)
+        prefix = _RUNLOG_HEADER_BYTES
+    elif not existing.endswith(b"\n"):
+        prefix = b"\n"
+    body = existing + prefix + _runlog_line(row).encode("utf-8")
     
     # Write back to S3
     s3_client.put_object(
         Bucket=bucket, 
         Key=key, 
-        Body=buf.getvalue().encode("utf-8"), 
+        Body=body, 
         ContentType="text/csv"
     )
 
@@ -298,10 +649,19 @@ def append_runlog_s3(
 # VALIDATION
 # ============================================================================
 
+@lru_cache(maxsize=4)
+def _freeze(items: tuple) -> frozenset:
+    return frozenset(items)
+
+
 def assert_allowed_bucket(bucket: str, allowed_buckets: Iterable[str]) -> None:
     """
     Verify bucket is in allowed list.
     
+    Sets and frozensets are used as-is and tuples are frozen once and cached,
+    so repeated checks against the same allow-list do not rebuild it. Other
+    iterables are converted on every call.
+    
     Parameters
     ----------
     bucket : str
@@ -314,7 +674,13 @@ def assert_allowed_bucket(bucket: str, allowed_buckets: Iterable[str]) -> None:
     ValueError
         If bucket is not in allowed list
     """
-    if bucket not in set(allowed_buckets or []):
+    if isinstance(allowed_buckets, (set, frozenset)):
+        allowed = allowed_buckets
+    elif isinstance(allowed_buckets, tuple):
+        allowed = _freeze(allowed_buckets)
+    else:
+        allowed = frozenset(allowed_buckets or ())
+    if bucket not in allowed:
         raise ValueError(
-            f"Bucket '{bucket}' not in allowed set: {set(allowed_buckets or [])}"
+            f"Bucket '{bucket}' not in allowed set: {set(allowed)}"
         )
@@ -6,31 +6,41 @@ Run with: pytest tests/test_strategy_rsi.py -v
 """
 import sys
 from pathlib import Path
-sys.path.insert(0, str(Path(__file__).parent.parent / "lib"))
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
 import unittest
 import numpy as np
 import pandas as pd
-from strategy_rsi import (
+from nadex_common.strategy_rsi import (
     rsi_wilder,
     macd,
     sma,
+    ema_last,
     trend_ok,
     generate_rsi_signals,
+    generate_rsi_signals_batch,
     calculate_signal_confidence,
+    calculate_signal_confidence_batch,
     apply_guardrails
 )
 
+# Price paths shared across tests, built once at import. Tests wrap them in
+# pd.Series as needed. The noise is seeded so every run sees the same data.
+_rng = np.random.default_rng(0)
+RAMP_50 = np.arange(100, 150)
+STEADY_UP_50 = 100 + 2.0 * np.arange(50)
+STEADY_DOWN_50 = 100 - 2.0 * np.arange(50)
+NOISY_UP_50 = 100 + 0.8 * np.arange(50) + _rng.uniform(-0.3, 0.3, 50)
+NOISY_DOWN_50 = 100 - 0.8 * np.arange(50) + _rng.uniform(-0.3, 0.3, 50)
+
 
 class TestRSIWilder(unittest.TestCase):
     """Test RSI calculation using Wilder's smoothing method."""
     
     def test_rsi_simple_uptrend(self):
         """Test RSI in a clear uptrend."""
-        # Create realistic uptrend with some noise (50 points to ensure sufficient data)
-        base = 100
-        trend = [base + i*0.8 + np.random.uniform(-0.3, 0.3) for i in range(50)]
-        prices = pd.Series(trend)
+        # Realistic uptrend with some noise (50 points to ensure sufficient data)
+        prices = pd.Series(NOISY_UP_50)
         rsi = rsi_wilder(prices, period=14)
         
         # RSI should be high (>50) in uptrend after warm-up
@@ -41,10 +51,8 @@ class TestRSIWilder(unittest.TestCase):
     
     def test_rsi_simple_downtrend(self):
         """Test RSI in a clear downtrend."""
-        # Create realistic downtrend with some noise (50 points to ensure sufficient data)
-        base = 100
-        trend = [base - i*0.8 + np.random.uniform(-0.3, 0.3) for i in range(50)]
-        prices = pd.Series(trend)
+        # Realistic downtrend with some noise (50 points to ensure sufficient data)
+        prices = pd.Series(NOISY_DOWN_50)
         rsi = rsi_wilder(prices, period=14)
         
         # RSI should be low (<50) in downtrend
@@ -67,10 +75,51 @@ class TestRSIWilder(unittest.TestCase):
     
     def test_rsi_length_matches_input(self):
         """Test that RSI output has same length as input."""
-        prices = pd.Series(range(100, 150))
+        prices = pd.Series(RAMP_50)
         rsi = rsi_wilder(prices, period=14)
         assert len(rsi) == len(prices), "RSI length should match price length"
 
+    def test_rsi_extremes(self):
+        """Test RSI is 100 with no losses and 0 with no gains."""
+        rsi_up = rsi_wilder(pd.Series(range(100, 130)), period=14)
+        rsi_down = rsi_wilder(pd.Series(range(130, 100, -1)), period=14)
+
+        assert rsi_up.iloc[-1] == 100.0, f"Expected RSI 100 with no losses, got {rsi_up.iloc[-1]:.2f}"
+        assert rsi_down.iloc[-1] == 0.0, f"Expected RSI 0 with no gains, got {rsi_down.iloc[-1]:.2f}"
+
+    def test_rsi_matches_pandas_ewm(self):
+        """Test RSI matches the pandas ewm(alpha=1/period) reference after warm-up."""
+        prices = pd.Series(100 + np.cumsum(np.sin(np.arange(120) * 0.7)))
+        rsi = rsi_wilder(prices, period=14)
+
+        delta = prices.diff()
+        avg_gain = delta.clip(lower=0).ewm(alpha=1/14, adjust=False, min_periods=14).mean()
+        avg_loss = (-delta.clip(upper=0)).ewm(alpha=1/14, adjust=False, min_periods=14).mean()
+        ref = 100 - 100 / (1 + avg_gain / avg_loss)
+        np.testing.assert_allclose(rsi.iloc[14:], ref.iloc[14:], atol=1e-9)
+        assert (rsi.iloc[:14] == 0.0).all(), "Warm-up bars should read 0"
+
+    def test_rsi_matches_pandas_ewm_with_missing_bar(self):
+        """Test a NaN close is skipped exactly as the pandas ewm reference skips it."""
+        prices = pd.Series(100 + np.cumsum(np.sin(np.arange(60) * 0.7)))
+        prices[30] = np.nan
+        rsi = rsi_wilder(prices, period=14)
+
+        delta = prices.diff()
+        avg_gain = delta.clip(lower=0).ewm(alpha=1/14, adjust=False, min_periods=14).mean()
+        avg_loss = (-delta.clip(upper=0)).ewm(alpha=1/14, adjust=False, min_periods=14).mean()
+        ref = 100 - 100 / (1 + avg_gain / avg_loss)
+        np.testing.assert_allclose(rsi.iloc[14:], ref.iloc[14:], atol=1e-9)
+
+    def test_rsi_float32_output(self):
+        """Test dtype=float32 only narrows the stored RSI values."""
+        prices = pd.Series(100 + np.cumsum(np.sin(np.arange(60) * 0.7)))
+        rsi64 = rsi_wilder(prices, period=14)
+        rsi32 = rsi_wilder(prices, period=14, dtype=np.float32)
+
+        assert rsi32.dtype == np.float32, f"Expected float32 RSI, got {rsi32.dtype}"
+        np.testing.assert_allclose(rsi32, rsi64, rtol=1e-6)
+
 
 class TestMACD(unittest.TestCase):
     """Test MACD calculation."""
@@ -78,7 +127,7 @@ class TestMACD(unittest.TestCase):
     def test_macd_uptrend(self):
         """Test MACD in uptrend shows positive values."""
         # Strong uptrend
-        prices = pd.Series([100 + i*2 for i in range(50)])
+        prices = pd.Series(STEADY_UP_50)
         line, signal, hist = macd(prices, fast=12, slow=26, signal=9)
         
         # In uptrend, MACD line should be above signal line
@@ -88,7 +137,7 @@ class TestMACD(unittest.TestCase):
     def test_macd_downtrend(self):
         """Test MACD in downtrend shows negative values."""
         # Strong downtrend
-        prices = pd.Series([100 - i*2 for i in range(50)])
+        prices = pd.Series(STEADY_DOWN_50)
         line, signal, hist = macd(prices, fast=12, slow=26, signal=9)
         
         # In downtrend, MACD line should be below signal line
@@ -97,19 +146,68 @@ class TestMACD(unittest.TestCase):
     
     def test_macd_length_matches_input(self):
         """Test that MACD outputs have same length as input."""
-        prices = pd.Series(range(100, 150))
+        prices = pd.Series(RAMP_50)
         line, signal, hist = macd(prices)
         assert len(line) == len(prices), "MACD line length should match price length"
         assert len(signal) == len(prices), "MACD signal length should match price length"
         assert len(hist) == len(prices), "MACD histogram length should match price length"
 
+    def test_macd_matches_pandas_ewm(self):
+        """Test MACD matches the pandas ewm(adjust=False) reference."""
+        prices = pd.Series(100 + np.cumsum(np.sin(np.arange(120) * 0.3)))
+        line, signal, hist = macd(prices, fast=12, slow=26, signal=9)
+
+        ref_line = (prices.ewm(span=12, adjust=False).mean()
+                    - prices.ewm(span=26, adjust=False).mean())
+        ref_signal = ref_line.ewm(span=9, adjust=False).mean()
+        np.testing.assert_allclose(line, ref_line, atol=1e-9)
+        np.testing.assert_allclose(signal, ref_signal, atol=1e-9)
+        np.testing.assert_allclose(hist, ref_line - ref_signal, atol=1e-9)
+
+    def test_macd_matches_pandas_ewm_with_missing_bar(self):
+        """Test a NaN close is skipped exactly as the pandas ewm reference skips it."""
+        prices = pd.Series(100 + np.cumsum(np.sin(np.arange(60) * 0.3)))
+        prices[30] = np.nan
+        line, signal, hist = macd(prices, fast=12, slow=26, signal=9)
+
+        ref_line = (prices.ewm(span=12, adjust=False).mean()
+                    - prices.ewm(span=26, adjust=False).mean())
+        ref_signal = ref_line.ewm(span=9, adjust=False).mean()
+        assert not line.isna().any(), "MACD should carry through a missing bar"
+        np.testing.assert_allclose(line, ref_line, atol=1e-9)
+        np.testing.assert_allclose(signal, ref_signal, atol=1e-9)
+        np.testing.assert_allclose(hist, ref_line - ref_signal, atol=1e-9)
+
+
+class TestSMA(unittest.TestCase):
+    """Test simple moving average."""
+    
+    def test_sma_flat_prices_exact(self):
+        """Test a flat window averages to exactly the price (no trend flip on ties)."""
+        prices = pd.Series([100.1] * 60)
+        ma = sma(prices, window=20)
+        
+        assert ma.iloc[:19].isna().all(), "Warm-up bars should be NaN"
+        assert (ma.iloc[19:] == 100.1).all(), "Flat window should average to the exact price"
+
+
+class TestEMALast(unittest.TestCase):
+    """Test the latest-value EMA shortcut."""
+    
+    def test_matches_full_ewm(self):
+        """Test ema_last equals the last value of the full pandas EMA."""
+        prices = pd.Series(100 + np.cumsum(np.sin(np.arange(90) * 0.4)))
+        for span in (12, 26):
+            expected = prices.ewm(span=span, adjust=False).mean().iloc[-1]
+            assert abs(ema_last(prices, span) - expected) < 1e-9, f"ema_last mismatch for span {span}"
+
 
 class TestTrendOk(unittest.TestCase):
     """Test trend detection logic."""
     
     def test_trend_none(self):
         """Test that trend='none' returns all zeros."""
-        prices = pd.Series(range(100, 150))
+        prices = pd.Series(RAMP_50)
         cfg = {"trend": {"type": "none"}}
         trend = trend_ok(prices, cfg)
         
@@ -118,7 +216,7 @@ class TestTrendOk(unittest.TestCase):
     def test_trend_macd_uptrend(self):
         """Test MACD trend detection in uptrend."""
         # Strong uptrend
-        prices = pd.Series([100 + i*2 for i in range(50)])
+        prices = pd.Series(STEADY_UP_50)
         cfg = {
             "trend": {
                 "type": "macd",
@@ -135,7 +233,7 @@ class TestTrendOk(unittest.TestCase):
     def test_trend_macd_downtrend(self):
         """Test MACD trend detection in downtrend."""
         # Strong downtrend
-        prices = pd.Series([100 - i*2 for i in range(50)])
+        prices = pd.Series(STEADY_DOWN_50)
         cfg = {
             "trend": {
                 "type": "macd",
@@ -171,7 +269,7 @@ class TestGenerateRSISignals(unittest.TestCase):
     def test_centerline_mode_buy_signal(self):
         """Test buy signal in centerline mode with uptrend."""
         # Create strong consistent uptrend (+2 per day for 50 days)
-        prices = pd.Series([100 + i*2.0 for i in range(50)])
+        prices = pd.Series(STEADY_UP_50)
         cfg = {
             "rsi": {"mode": "centerline", "period": 14, "centerline": 50},
             "trend": {"type": "macd", "macd_fast": 12, "macd_slow": 26, "macd_signal": 9}
@@ -179,14 +277,6 @@ class TestGenerateRSISignals(unittest.TestCase):
         
         signals = generate_rsi_signals(prices, cfg)
         
-        # Debug: Print last few rows to see what's happening
-        print("\n=== DEBUG: test_centerline_mode_buy_signal ===")
-        print(f"Last price: {prices.iloc[-1]}")
-        print(f"Last 5 signals:\n{signals.tail()}")
-        print(f"RSI last: {signals['rsi'].iloc[-1]}")
-        print(f"Trend side last: {signals['trend_side'].iloc[-1]}")
-        print(f"Signal last: {signals['signal'].iloc[-1]}")
-        
         # Should generate buy signal (1) at the end
         assert signals['signal'].iloc[-1] == 1, f"Expected buy signal (1), got {signals['signal'].iloc[-1]}"
         assert signals['rsi'].iloc[-1] > 50, "RSI should be > 50 for buy signal"
@@ -233,7 +323,7 @@ class TestGenerateRSISignals(unittest.TestCase):
     
     def test_signal_dataframe_structure(self):
         """Test that signal DataFrame has correct structure."""
-        prices = pd.Series(range(100, 150))
+        prices = pd.Series(RAMP_50)
         cfg = {
             "rsi": {"mode": "centerline", "period": 14, "centerline": 50},
             "trend": {"type": "none"}
@@ -246,6 +336,67 @@ class TestGenerateRSISignals(unittest.TestCase):
         assert 'trend_side' in signals.columns, "Should have 'trend_side' column"
         assert 'signal' in signals.columns, "Should have 'signal' column"
         assert len(signals) == len(prices), "Signal length should match price length"
+        assert signals['rsi'].dtype == np.float32, "RSI should be stored as float32"
+        assert signals['trend_side'].dtype == np.int8, "Trend side should be stored as int8"
+        assert signals['signal'].dtype == np.int8, "Signal should be stored as int8"
+
+    def test_signals_match_indicator_functions(self):
+        """Test signal columns agree with rsi_wilder and trend_ok for each trend type."""
+        prices = pd.Series(100 + np.cumsum(np.sin(np.arange(120) * 0.3)))
+        for trend_type in ("none", "macd", "sma"):
+            cfg = {
+                "rsi": {"mode": "centerline", "period": 14, "centerline": 50},
+                "trend": {"type": trend_type, "sma_window": 20}
+            }
+            signals = generate_rsi_signals(prices, cfg)
+            
+            np.testing.assert_array_equal(signals['rsi'], rsi_wilder(prices, 14).astype(np.float32))
+            np.testing.assert_array_equal(signals['trend_side'], trend_ok(prices, cfg))
+
+    def test_signals_match_indicator_functions_with_missing_bar(self):
+        """Test a NaN close gives the same columns as the indicator functions."""
+        prices = pd.Series(100 + np.cumsum(np.sin(np.arange(60) * 0.3)))
+        prices[30] = np.nan
+        for trend_type in ("none", "macd", "sma"):
+            cfg = {
+                "rsi": {"mode": "centerline", "period": 14, "centerline": 50},
+                "trend": {"type": trend_type, "sma_window": 20}
+            }
+            signals = generate_rsi_signals(prices, cfg)
+            rsi = rsi_wilder(prices, 14).astype(np.float32)
+            trend_side = trend_ok(prices, cfg)
+            expected = np.where((rsi > 50) & (trend_side >= 0), 1,
+                                np.where((rsi < 50) & (trend_side <= 0), -1, 0))
+            
+            np.testing.assert_array_equal(signals['rsi'], rsi)
+            np.testing.assert_array_equal(signals['trend_side'], trend_side)
+            np.testing.assert_array_equal(signals['signal'], expected)
+
+    def test_signals_do_not_alias_input(self):
+        """Test writing to the signal frame leaves the caller's prices untouched."""
+        cfg = {"rsi": {"mode": "centerline"}, "trend": {"type": "none"}}
+        for prices in (pd.Series(STEADY_UP_50.copy()), STEADY_UP_50.copy()):
+            signals = generate_rsi_signals(prices, cfg)
+            signals.loc[signals.index[0], 'close'] = -1.0
+            
+            assert prices[0] == STEADY_UP_50[0], f"Input changed via the frame for {type(prices).__name__}"
+
+    def test_batch_matches_per_series(self):
+        """Test the 2-D batch matches generate_rsi_signals row by row."""
+        steps = np.arange(80)
+        close_2d = np.vstack([100 + np.cumsum(np.sin(steps * f)) for f in (0.2, 0.5, 0.9)])
+        close_2d[1, 40] = np.nan
+        cfg = {
+            "rsi": {"mode": "reversal", "period": 14, "oversold": 40, "overbought": 60},
+            "trend": {"type": "macd"}
+        }
+        rsi, trend_side, signal = generate_rsi_signals_batch(close_2d, cfg)
+        
+        for row, close in enumerate(close_2d):
+            expected = generate_rsi_signals(pd.Series(close), cfg)
+            np.testing.assert_array_equal(rsi[row], expected['rsi'])
+            np.testing.assert_array_equal(trend_side[row], expected['trend_side'])
+            np.testing.assert_array_equal(signal[row], expected['signal'])
 
 
 class TestCalculateSignalConfidence(unittest.TestCase):
@@ -348,6 +499,22 @@ class TestCalculateSignalConfidence(unittest.TestCase):
                     assert 0.0 <= confidence <= 1.0, \
                         f"Confidence {confidence} out of bounds for RSI={rsi}, trend={trend}, signal={sig}"
 
+    def test_batch_matches_scalar(self):
+        """Test that batch confidence matches the scalar version row by row."""
+        grid = [(rsi, trend, sig)
+                for rsi in [0.0, 20.0, 32.0, 50.0, 57.5, 68.0, 75.0, 100.0]
+                for trend in [-1, 0, 1]
+                for sig in [-1, 0, 1]]
+        rsi, trend, sig = (np.array(col) for col in zip(*grid))
+        
+        for mode in ["centerline", "reversal"]:
+            batch = calculate_signal_confidence_batch(rsi, trend, sig, rsi_mode=mode)
+            expected = [
+                calculate_signal_confidence(rsi=r, trend_side=t, signal=s, rsi_mode=mode)
+                for r, t, s in grid
+            ]
+            np.testing.assert_allclose(batch, expected, err_msg=f"Mismatch in {mode} mode")
+
 
 class TestApplyGuardrails(unittest.TestCase):
     """Test guardrail filtering logic."""
@@ -394,6 +561,24 @@ class TestApplyGuardrails(unittest.TestCase):
         assert len(trades) == 3, f"Expected max 3 positions, got {len(trades)}"
         assert list(trades['Ticker']) == ['A', 'B', 'C'], "Should keep top 3 by confidence"
     
+    def test_max_positions_ties_keep_earliest(self):
+        """Test that confidence ties at the cut-off keep the earliest rows."""
+        df = pd.DataFrame({
+            'signal': [1, -1, 1, 1, -1, 1],
+            'Confidence': [0.7, 0.9, 0.7, 0.7, 0.7, 0.5],
+            'Ticker': ['A', 'B', 'C', 'D', 'E', 'F']
+        })
+        cfg = {
+            'guardrails': {
+                'confidence_threshold': 0.3,
+                'max_positions_per_day': 3
+            }
+        }
+        
+        result = apply_guardrails(df, cfg, signal_col='signal', confidence_col='Confidence')
+        
+        assert list(result['Ticker']) == ['A', 'B', 'C'], f"Expected earliest ties kept, got {list(result['Ticker'])}"
+    
     def test_combined_filtering(self):
         """Test confidence threshold + max positions together."""
         df = pd.DataFrame({
@@ -435,6 +620,26 @@ class TestApplyGuardrails(unittest.TestCase):
         no_trades = result[result['signal'] == 0]
         assert len(no_trades) == 2, "Should preserve no-trade signals"
 
+    def test_preserves_original_order(self):
+        """Test that kept rows stay in their original order and index."""
+        df = pd.DataFrame({
+            'signal': [0, 1, 1, 0, -1, 1],
+            'Confidence': [0.0, 0.4, 0.9, 0.0, 0.7, 0.7],
+            'Ticker': ['A', 'B', 'C', 'D', 'E', 'F']
+        })
+        cfg = {
+            'guardrails': {
+                'confidence_threshold': 0.3,
+                'max_positions_per_day': 2
+            }
+        }
+        
+        result = apply_guardrails(df, cfg, signal_col='signal', confidence_col='Confidence')
+        
+        # Top 2 are C (0.9) and E (0.7, first of the tie with F)
+        assert list(result['Ticker']) == ['A', 'C', 'D', 'E'], "Should keep rows in original order"
+        assert list(result.index) == [0, 2, 3, 4], "Should keep the original index"
+
 
 class TestIntegration(unittest.TestCase):
     """Integration tests using complete workflow."""
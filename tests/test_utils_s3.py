@@ -0,0 +1,504 @@
+"""
+Unit tests for utils_s3.py
+
+Runs the run log and upload helpers against an in-memory fake S3 client.
+Run with: pytest tests/test_utils_s3.py -v
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import contextlib
+import csv
+import hashlib
+import io
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import boto3
+import numpy as np
+import pandas as pd
+from botocore import UNSIGNED
+from botocore.exceptions import ClientError
+from botocore.stub import Stubber
+from s3transfer.exceptions import CancelledError
+
+from nadex_common import utils_s3
+from nadex_common.strategy_rsi import generate_rsi_signals
+from nadex_common.utils_s3 import (
+    MULTIPART_MIN_PART_SIZE,
+    RUNLOG_FIELDS,
+    RUNLOG_READ_CHUNK,
+    append_runlog_s3,
+    assert_allowed_bucket,
+    create_s3_clients,
+    save_dataframe_to_s3_parquet,
+    save_signals_df_to_s3,
+    upload_df_to_s3_in_background,
+    upload_df_to_s3_with_validation,
+    _runlog_line,
+    _RUNLOG_HEADER_BYTES,
+)
+
+BUCKET = "test-bucket"
+KEY = "logs/run_log.csv"
+
+
+def _client_error(code: str, op: str) -> ClientError:
+    return ClientError({"Error": {"Code": code, "Message": f"{code} message"}}, op)
+
+
+def _etag(data: bytes) -> str:
+    return '"' + hashlib.md5(data).hexdigest() + '"'
+
+
+class FakeS3Client:
+    """Minimal in-memory S3 client covering the calls made by utils_s3."""
+
+    def __init__(self, objects=None):
+        self.objects = dict(objects or {})
+        self.calls = []
+        self.parts = {}
+        self.content_types = {}
+
+    def _check_etag(self, key, etag, op):
+        if etag is not None and etag != _etag(self.objects[key]):
+            raise _client_error("PreconditionFailed", op)
+
+    def get_object(self, Bucket, Key, Range=None, IfMatch=None):
+        self.calls.append(("get_object", Range))
+        if Key not in self.objects:
+            raise _client_error("NoSuchKey", "GetObject")
+        self._check_etag(Key, IfMatch, "GetObject")
+        data = self.objects[Key]
+        if Range is None:
+            return {"Body": io.BytesIO(data), "ContentLength": len(data), "ETag": _etag(data)}
+        if not data:
+            raise _client_error("InvalidRange", "GetObject")
+        lo, hi = (int(b) for b in Range[len("bytes="):].split("-"))
+        hi = min(hi, len(data) - 1)
+        return {
+            "Body": io.BytesIO(data[lo:hi + 1]),
+            "ContentLength": hi + 1 - lo,
+            "ContentRange": f"bytes {lo}-{hi}/{len(data)}",
+            "ETag": _etag(data),
+        }
+
+    def put_object(self, Bucket, Key, Body, ContentType=None):
+        self.calls.append(("put_object", None))
+        self.objects[Key] = Body
+        self.content_types[Key] = ContentType
+
+    def create_multipart_upload(self, Bucket, Key, ContentType=None):
+        self.calls.append(("create_multipart_upload", None))
+        return {"UploadId": "upload-1"}
+
+    def upload_part_copy(self, Bucket, Key, UploadId, PartNumber, CopySource, CopySourceIfMatch=None):
+        self.calls.append(("upload_part_copy", None))
+        self._check_etag(CopySource["Key"], CopySourceIfMatch, "UploadPartCopy")
+        self.parts[PartNumber] = self.objects[CopySource["Key"]]
+        return {"CopyPartResult": {"ETag": f'"part-{PartNumber}"'}}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self.calls.append(("upload_part", None))
+        self.parts[PartNumber] = Body
+        return {"ETag": f'"part-{PartNumber}"'}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        self.calls.append(("complete_multipart_upload", None))
+        numbers = [p["PartNumber"] for p in MultipartUpload["Parts"]]
+        self.objects[Key] = b"".join(self.parts[n] for n in numbers)
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.calls.append(("abort_multipart_upload", None))
+        self.parts.clear()
+
+    def upload_fileobj(self, Fileobj, Bucket, Key, ExtraArgs=None, Config=None):
+        self.calls.append(("upload_fileobj", None))
+        self.objects[Key] = Fileobj.read()
+
+
+def _dictwriter_line(row: dict) -> str:
+    buf = io.StringIO()
+    csv.DictWriter(buf, fieldnames=RUNLOG_FIELDS).writerow(row)
+    return buf.getvalue()
+
+
+def _existing_log(min_size: int) -> bytes:
+    # Header plus enough well-formed rows to reach min_size bytes
+    line = ("2025-11-20,2025-11-20T09:00:00,2025-11-20T09:05:00,True,"
+            "0,0,0,20251120T090000,Recommendation run\r\n").encode("utf-8")
+    return _RUNLOG_HEADER_BYTES + line * (min_size // len(line) + 1)
+
+
+def _last_line(body: bytes) -> str:
+    return body.decode("utf-8").split("\r\n")[-2] + "\r\n"
+
+
+class TestRunlogLine(unittest.TestCase):
+    """Test run log rows are formatted exactly as csv.DictWriter formats them."""
+
+    def test_header_matches_dictwriter(self):
+        """Test the precomputed header bytes match DictWriter.writeheader."""
+        buf = io.StringIO()
+        csv.DictWriter(buf, fieldnames=RUNLOG_FIELDS).writeheader()
+        assert _RUNLOG_HEADER_BYTES == buf.getvalue().encode("utf-8")
+
+    def test_rows_match_dictwriter(self):
+        """Test plain, quoted, multi-line and empty fields byte for byte."""
+        base = {
+            "date": "2025-11-20", "start_time": "2025-11-20T09:00:00",
+            "end_time": "2025-11-20T09:05:00", "status": True,
+            "files_processed": 3, "files_skipped": 0, "files_error": 1,
+            "run_id": "20251120T090000", "notes": "Recommendation run - RSI:centerline"
+        }
+        for notes in ("", "a,b", 'say "hi"', "line1\nline2", "cr\rhere", "ünïcode", None):
+            row = dict(base, notes=notes)
+            assert _runlog_line(row) == _dictwriter_line(row), f"Row differs for notes={notes!r}"
+
+
+class TestAppendRunlog(unittest.TestCase):
+    """Test append_runlog_s3 on each size path of the existing log."""
+
+    def _append(self, client):
+        append_runlog_s3(client, BUCKET, KEY, status="success", run_id="r1", notes="n,1")
+        return client.objects[KEY]
+
+    def test_missing_log_writes_header(self):
+        """Test a missing log is created with the header and one row."""
+        client = FakeS3Client()
+        body = self._append(client)
+
+        assert body.startswith(_RUNLOG_HEADER_BYTES), "New log should start with the header"
+        rows = list(csv.DictReader(io.StringIO(body.decode("utf-8"))))
+        assert len(rows) == 1 and rows[0]["run_id"] == "r1" and rows[0]["notes"] == "n,1"
+
+    def test_empty_log_writes_header(self):
+        """Test an empty log object (InvalidRange on read) gets the header."""
+        client = FakeS3Client({KEY: b""})
+        body = self._append(client)
+
+        assert body.startswith(_RUNLOG_HEADER_BYTES), "Empty log should get the header"
+        assert body.count(b"\r\n") == 2, "Expected header plus one row"
+
+    def test_small_log_single_read(self):
+        """Test a log under one read chunk is fetched with a single GET."""
+        existing = _existing_log(1024)
+        client = FakeS3Client({KEY: existing})
+        body = self._append(client)
+
+        gets = [c for c in client.calls if c[0] == "get_object"]
+        assert len(gets) == 1, f"Expected one GET, got {len(gets)}"
+        assert body.startswith(existing), "Existing rows should be kept"
+        assert body[len(existing):].decode("utf-8") == _last_line(body), "Expected one new row"
+
+    def test_missing_trailing_newline(self):
+        """Test a row is not glued onto an unterminated last line."""
+        existing = _existing_log(1024).rstrip(b"\r\n")
+        client = FakeS3Client({KEY: existing})
+        body = self._append(client)
+
+        assert body.startswith(existing + b"\n"), "Expected a newline before the new row"
+
+    def test_mid_size_log_ranged_reads(self):
+        """Test a log over one read chunk is completed with ranged GETs."""
+        existing = _existing_log(3 * RUNLOG_READ_CHUNK)
+        assert len(existing) < MULTIPART_MIN_PART_SIZE
+        client = FakeS3Client({KEY: existing})
+        body = self._append(client)
+
+        gets = [c for c in client.calls if c[0] == "get_object"]
+        assert len(gets) > 2, f"Expected ranged GETs after the first chunk, got {len(gets)}"
+        assert all(rng is not None for _, rng in gets), "Every read should be ranged"
+        assert body.startswith(existing), "Ranged reads should reassemble the log exactly"
+        rows = list(csv.DictReader(io.StringIO(body.decode("utf-8"))))
+        assert rows[-1]["run_id"] == "r1"
+
+    def test_large_log_multipart_append(self):
+        """Test a log of at least 5 MiB is appended by multipart copy, not re-uploaded."""
+        existing = _existing_log(MULTIPART_MIN_PART_SIZE)
+        client = FakeS3Client({KEY: existing})
+        body = self._append(client)
+
+        names = [c[0] for c in client.calls]
+        assert "put_object" not in names, "Large log should not be re-uploaded"
+        assert "upload_part_copy" in names and "complete_multipart_upload" in names
+        assert body.startswith(existing), "Existing bytes should be copied unchanged"
+        assert body[len(existing):].decode("utf-8") == _last_line(body), "Expected one new row"
+
+    def test_large_log_aborts_on_concurrent_write(self):
+        """Test the multipart upload is aborted when the log changes underneath it."""
+        existing = _existing_log(MULTIPART_MIN_PART_SIZE)
+        client = FakeS3Client({KEY: existing})
+        original = client.create_multipart_upload
+
+        def create_then_modify(**kwargs):
+            client.objects[KEY] = existing + b"x\r\n"
+            return original(**kwargs)
+
+        client.create_multipart_upload = create_then_modify
+        with self.assertRaises(ClientError):
+            self._append(client)
+        assert ("abort_multipart_upload", None) in client.calls, "Upload should be aborted"
+
+
+class TestUploadErrors(unittest.TestCase):
+    """Test upload ClientErrors are reported as RuntimeError."""
+
+    def _upload_with_error(self, code):
+        client = FakeS3Client()
+        client.upload_fileobj = mock.Mock(side_effect=_client_error(code, "PutObject"))
+        df = pd.DataFrame({"a": [1, 2]})
+        with mock.patch.object(utils_s3, "_default_s3_client", return_value=client):
+            with self.assertRaises(RuntimeError) as ctx:
+                upload_df_to_s3_with_validation(df, f" {BUCKET} ", "recs/x.csv", region="us-west-2")
+        return str(ctx.exception)
+
+    def test_bucket_access_errors(self):
+        """Test NoSuchBucket and AccessDenied name the bucket and region."""
+        for code in ("NoSuchBucket", "AccessDenied"):
+            msg = self._upload_with_error(code)
+            assert msg.startswith(f"Could not access bucket '{BUCKET}' (region=us-west-2)"), msg
+            assert f"(code {code})" in msg, msg
+
+    def test_other_errors(self):
+        """Test other codes name the object that failed."""
+        msg = self._upload_with_error("InternalError")
+        assert msg == f"Failed to upload CSV to s3://{BUCKET}/recs/x.csv: InternalError message", msg
+
+    def test_successful_upload(self):
+        """Test the CSV body reaches the client unchanged."""
+        client = FakeS3Client()
+        df = pd.DataFrame({"a": [1, 2], "b": ["x", "y"]})
+        with mock.patch.object(utils_s3, "_default_s3_client", return_value=client):
+            upload_df_to_s3_with_validation(df, BUCKET, "recs/x.csv")
+        assert client.objects["recs/x.csv"] == df.to_csv(index=False).encode("utf-8")
+
+
+class TestUploadInBackground(unittest.TestCase):
+    """Test upload_df_to_s3_in_background against a stubbed botocore client."""
+
+    def setUp(self):
+        # TransferManager needs a real client; the Stubber answers its calls
+        self.client = boto3.client(
+            "s3", region_name="us-west-2",
+            aws_access_key_id="testing", aws_secret_access_key="testing"
+        )
+        self.stubber = Stubber(self.client)
+        self.stubber.activate()
+        self.addCleanup(self.stubber.deactivate)
+        patcher = mock.patch.object(utils_s3, "_default_s3_client", return_value=self.client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.df = pd.DataFrame({"a": [1, 2]})
+
+    def _run(self, body=lambda: None):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            with upload_df_to_s3_in_background(self.df, f" {BUCKET} ", "recs/x.csv",
+                                               region="us-west-2"):
+                body()
+        return out.getvalue()
+
+    def test_success_prints_after_upload(self):
+        """Test a successful upload is reported once the block exits."""
+        self.stubber.add_response("put_object", {"ETag": '"etag"'})
+        out = self._run()
+
+        self.stubber.assert_no_pending_responses()
+        assert out == f"✅ Uploaded to s3://{BUCKET}/recs/x.csv\n", out
+
+    def test_bucket_access_error(self):
+        """Test NoSuchBucket maps to the same RuntimeError as the blocking upload."""
+        self.stubber.add_client_error("put_object", "NoSuchBucket", "NoSuchBucket message")
+        with self.assertRaises(RuntimeError) as ctx:
+            self._run()
+        msg = str(ctx.exception)
+        assert msg == (f"Could not access bucket '{BUCKET}' (region=us-west-2): "
+                       "NoSuchBucket message (code NoSuchBucket)"), msg
+
+    def test_other_error(self):
+        """Test other codes name the object that failed and print nothing."""
+        self.stubber.add_client_error("put_object", "InternalError", "InternalError message")
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out), self.assertRaises(RuntimeError) as ctx:
+            with upload_df_to_s3_in_background(self.df, BUCKET, "recs/x.csv"):
+                pass
+        assert str(ctx.exception) == f"Failed to upload CSV to s3://{BUCKET}/recs/x.csv: InternalError message"
+        assert out.getvalue() == "", "Nothing should be printed for a failed upload"
+
+    def test_body_error_cancels_upload(self):
+        """Test an error in the body propagates, cancels the upload and prints nothing."""
+        def fail():
+            raise ValueError("body failed")
+
+        # Hold the PUT long enough for the body to raise first
+        self.client.meta.events.register("before-call.s3.PutObject", lambda **kw: time.sleep(0.2))
+        self.stubber.add_response("put_object", {"ETag": '"etag"'})
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out), self.assertRaises(ValueError):
+            with upload_df_to_s3_in_background(self.df, BUCKET, "recs/x.csv") as future:
+                fail()
+        with self.assertRaises(CancelledError):
+            future.result()
+        assert out.getvalue() == "", "Nothing should be printed for a cancelled upload"
+
+
+class TestSaveSignalsCSV(unittest.TestCase):
+    """Test the Arrow and pandas CSV writers produce the same signals file."""
+
+    def _save(self, df, block_pyarrow=False):
+        client = FakeS3Client()
+        modules = {"pyarrow": None, "pyarrow.csv": None} if block_pyarrow else {}
+        with mock.patch.dict(sys.modules, modules):
+            save_signals_df_to_s3(client, df, BUCKET, "signals/x.csv")
+        return client.objects["signals/x.csv"]
+
+    def test_arrow_matches_pandas_fallback(self):
+        """Test the header matches exactly and the rows read back to the same values."""
+        prices = pd.Series(100 + np.cumsum(np.sin(np.arange(60) * 0.3)))
+        prices[30] = np.nan
+        df = generate_rsi_signals(prices, {"rsi": {"mode": "centerline"}, "trend": {"type": "macd"}})
+        arrow = self._save(df)
+        fallback = self._save(df, block_pyarrow=True)
+
+        assert arrow.split(b"\n", 1)[0] == b"close,rsi,trend_side,signal", arrow[:60]
+        assert arrow.split(b"\n", 1)[0] == fallback.split(b"\n", 1)[0]
+        pd.testing.assert_frame_equal(pd.read_csv(io.BytesIO(arrow)), pd.read_csv(io.BytesIO(fallback)))
+
+
+
+class TestSaveParquet(unittest.TestCase):
+    """Test save_dataframe_to_s3_parquet round-trips a signals frame."""
+
+    def setUp(self):
+        prices = pd.Series(100 + np.cumsum(np.sin(np.arange(60) * 0.3)),
+                           index=pd.date_range("2025-01-01", periods=60, name="Date"))
+        self.df = generate_rsi_signals(prices, {"rsi": {"mode": "centerline"}, "trend": {"type": "macd"}})
+
+    def _save(self, **kwargs):
+        client = FakeS3Client()
+        save_dataframe_to_s3_parquet(client, self.df, BUCKET, "signals/x.parquet", **kwargs)
+        assert client.content_types["signals/x.parquet"] == "application/vnd.apache.parquet"
+        return pd.read_parquet(io.BytesIO(client.objects["signals/x.parquet"]))
+
+    def test_dtypes_survive(self):
+        """Test the float32/int8 columns come back with their dtypes and values."""
+        back = self._save()
+
+        assert back["rsi"].dtype == np.float32, back["rsi"].dtype
+        assert back["trend_side"].dtype == np.int8, back["trend_side"].dtype
+        assert back["signal"].dtype == np.int8, back["signal"].dtype
+        pd.testing.assert_frame_equal(back, self.df.reset_index(drop=True))
+
+    def test_index_kept_when_requested(self):
+        """Test index=True stores the index and index=False drops it."""
+        pd.testing.assert_frame_equal(self._save(index=True), self.df, check_freq=False)
+        assert isinstance(self._save().index, pd.RangeIndex), "Index should not be stored by default"
+
+
+
+class TestAssertAllowedBucket(unittest.TestCase):
+    """Test assert_allowed_bucket for each kind of allow-list."""
+
+    def test_allowed_for_each_iterable(self):
+        """Test a listed bucket passes for set, frozenset, tuple, list and generator."""
+        for allowed in ({BUCKET}, frozenset({BUCKET}), (BUCKET, "other"), [BUCKET], (b for b in [BUCKET])):
+            assert_allowed_bucket(BUCKET, allowed)
+
+    def test_error_message_unchanged(self):
+        """Test the ValueError text is the same for every allow-list type."""
+        for allowed in ({"other"}, frozenset({"other"}), ("other",), ["other"]):
+            with self.assertRaises(ValueError) as ctx:
+                assert_allowed_bucket(BUCKET, allowed)
+            assert str(ctx.exception) == f"Bucket '{BUCKET}' not in allowed set: {{'other'}}", str(ctx.exception)
+
+    def test_none_and_empty_reject_everything(self):
+        """Test None and empty allow-lists reject any bucket."""
+        for allowed in (None, (), [], set()):
+            with self.assertRaises(ValueError) as ctx:
+                assert_allowed_bucket(BUCKET, allowed)
+            assert str(ctx.exception) == f"Bucket '{BUCKET}' not in allowed set: set()", str(ctx.exception)
+
+    def test_sets_used_as_is(self):
+        """Test a set is checked directly rather than copied."""
+        class CountingSet(set):
+            lookups = 0
+
+            def __contains__(self, item):
+                CountingSet.lookups += 1
+                return super().__contains__(item)
+
+        assert_allowed_bucket(BUCKET, CountingSet({BUCKET}))
+        assert CountingSet.lookups == 1, "The caller's set should be used for the lookup"
+
+    def test_tuples_frozen_once(self):
+        """Test repeated checks against the same tuple reuse one cached frozenset."""
+        utils_s3._freeze.cache_clear()
+        allowed = (BUCKET, "other")
+        for _ in range(3):
+            assert_allowed_bucket(BUCKET, allowed)
+        info = utils_s3._freeze.cache_info()
+        assert (info.misses, info.hits) == (1, 2), info
+
+
+
+class TestCreateS3Clients(unittest.TestCase):
+    """Test create_s3_clients caching against a throwaway AWS profile."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        config = Path(tmp.name) / "config"
+        config.write_text(
+            "[profile nadex-test]\n"
+            "aws_access_key_id = testing\n"
+            "aws_secret_access_key = testing\n"
+        )
+        env = {
+            "AWS_CONFIG_FILE": str(config),
+            "AWS_SHARED_CREDENTIALS_FILE": str(Path(tmp.name) / "credentials"),
+        }
+        patcher = mock.patch.dict(os.environ, env)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        utils_s3._cached_s3_clients.cache_clear()
+        self.addCleanup(utils_s3._cached_s3_clients.cache_clear)
+
+    def test_repeated_calls_share_clients(self):
+        """Test repeated calls return the same clients in a fresh dict."""
+        first = create_s3_clients("nadex-test", "us-west-2")
+        second = create_s3_clients("nadex-test", "us-west-2")
+
+        assert first is not second, "Each call should return its own dict"
+        for name in ("public", "private", "resource"):
+            assert first[name] is second[name], f"{name} should be cached"
+        first["private"] = None
+        assert second["private"] is not None, "Editing one dict should not affect the cache"
+
+    def test_region_gets_own_clients(self):
+        """Test a different region builds separate clients."""
+        west = create_s3_clients("nadex-test", "us-west-2")
+        east = create_s3_clients("nadex-test", "us-east-1")
+
+        assert west["private"] is not east["private"]
+        assert east["public"].meta.region_name == "us-east-1"
+
+    def test_public_client_stays_unsigned(self):
+        """Test the merged config keeps UNSIGNED on the public client only."""
+        clients = create_s3_clients("nadex-test", "us-west-2")
+        public = clients["public"].meta.config
+        private = clients["private"].meta.config
+
+        assert public.signature_version is UNSIGNED, public.signature_version
+        assert private.signature_version is not UNSIGNED, "Private client should sign requests"
+        for config in (public, private):
+            assert config.max_pool_connections == 32, config.max_pool_connections
+            assert config.retries["mode"] == "adaptive", config.retries
+
+
+if __name__ == "__main__":
+    unittest.main()